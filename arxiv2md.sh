@@ -8,6 +8,8 @@ SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
 SRC_DIR="$SCRIPT_DIR/src"
 HTML_DIR="$SCRIPT_DIR/html"
 OUTPUT_DIR="$SCRIPT_DIR/output"
+# Interpreter to run the scripts with, e.g. PYTHON=pypy3
+PYTHON="${PYTHON:-python3}"
 
 if [ -z "$1" ]; then
     read -p "Enter arXiv ID (e.g. 2502.04307): " ARXIV_ID
@@ -25,12 +27,12 @@ ARXIV_ID="${ARXIV_ID#arxiv:}"
 HTML_FILE="$HTML_DIR/${ARXIV_ID}.html"
 
 # Step 1: Download HTML
-python3 "$SRC_DIR/arxiv2html.py" "$ARXIV_ID" "$HTML_FILE"
+"$PYTHON" "$SRC_DIR/arxiv2html.py" "$ARXIV_ID" "$HTML_FILE"
 
 # Step 2: Convert to Markdown (output filename based on paper title)
 echo ""
 echo "Converting to Markdown..."
-OUTPUT=$(python3 "$SRC_DIR/html2md.py" "$HTML_FILE" "$OUTPUT_DIR")
+OUTPUT=$("$PYTHON" "$SRC_DIR/html2md.py" "$HTML_FILE" "$OUTPUT_DIR")
 echo "$OUTPUT"
 
 # Extract output file path
@@ -10,14 +10,144 @@ Usage:
     python html_to_md.py input.html  # outputs to input.md
 """
 
+import mmap
 import re
 import sys
 from pathlib import Path
 
 
+# ============================================================================
+# Compiled patterns
+# ============================================================================
+# Every pattern is compiled once at import time, so stages and their per-match
+# callbacks call the pattern objects directly instead of going through the
+# re module cache on each call.
+
+_RE_TAG = re.compile(r'<[^>]+>')
+
+# Title / filename
+_RE_LTX_TITLE = re.compile(r'<h1[^>]*class="[^"]*ltx_title[^"]*"[^>]*>(.*?)</h1>', re.DOTALL | re.IGNORECASE)
+_RE_TITLE = re.compile(r'<title[^>]*>(.*?)</title>', re.DOTALL | re.IGNORECASE)
+_RE_ARXIV_SUFFIX = re.compile(r'\s*[|\-]\s*arXiv.*$', re.IGNORECASE)
+_RE_FILENAME_INVALID = re.compile(r'[<>:"/\\|?*]')
+_RE_WS = re.compile(r'\s+')
+
+# Stage 1
+# <head>, <script>, <style> and <nav> blocks; the backreference closes each
+# block with its own tag, so one pass removes all four.
+_RE_UNWANTED_BLOCKS = re.compile(r'<(head|script|style|nav)\b[^>]*>.*?</\1>', re.DOTALL | re.IGNORECASE)
+# Doctype and <html>/<body> wrappers
+_RE_UNWANTED_TAGS = re.compile(r'<!DOCTYPE[^>]*>|</?(?:html|body)[^>]*>', re.IGNORECASE)
+
+# Stage 2
+_RE_MATH = re.compile(r'<math[^>]*>.*?</math>', re.DOTALL)
+_RE_ANNOTATION = re.compile(r'<annotation[^>]*encoding="application/x-tex"[^>]*>(.*?)</annotation>', re.DOTALL)
+
+# Stage 3
+_HEADING_RES = tuple(
+    (re.compile(rf'<h{i}[^>]*>(.*?)</h{i}>', re.DOTALL | re.IGNORECASE), i)
+    for i in range(1, 7)
+)
+# Bold/italic/code elements (groups 1-2) or <br>/<hr> (group 3)
+_RE_INLINE = re.compile(r'<(strong|b|em|i|code)\b[^>]*>(.*?)</\1>|<(br|hr)\s*/?>', re.DOTALL | re.IGNORECASE)
+_INLINE_FORMATS = {
+    'strong': '**{}**', 'b': '**{}**', 'em': '*{}*', 'i': '*{}*', 'code': '`{}`',
+    'br': '\n', 'hr': '\n\n---\n\n',
+}
+_RE_LINK = re.compile(r'<a\b[^>]*>(.*?)</a>', re.DOTALL | re.IGNORECASE)
+_RE_HREF = re.compile(r'href=["\']([^"\']+)["\']')
+_RE_CITE = re.compile(r'<cite[^>]*>(.*?)</cite>', re.DOTALL | re.IGNORECASE)
+_RE_REF_SELF = re.compile(r'ltx_ref_self">([^<]+)<')
+
+# Stage 4
+_RE_FIGURE = re.compile(r'<figure[^>]*>.*?</figure>', re.DOTALL | re.IGNORECASE)
+_RE_FIGURE_IMG = re.compile(r'<img[^>]*src=["\']([^"\']+)["\'][^>]*/?>', re.IGNORECASE)
+_RE_FIGCAPTION = re.compile(r'<figcaption[^>]*>(.*?)</figcaption>', re.DOTALL | re.IGNORECASE)
+_RE_IMG = re.compile(r'<img[^>]*/?>(?![^<]*</figure>)', re.IGNORECASE)
+_RE_SRC = re.compile(r'src=["\']([^"\']+)["\']')
+_RE_ALT = re.compile(r'alt=["\']([^"\']*)["\']')
+
+# Stage 5
+_RE_TABLE = re.compile(r'<table[^>]*>.*?</table>', re.DOTALL | re.IGNORECASE)
+_RE_TR = re.compile(r'<tr[^>]*>(.*?)</tr>', re.DOTALL | re.IGNORECASE)
+_RE_TD = re.compile(r'<(?:th|td)[^>]*>(.*?)</(?:th|td)>', re.DOTALL | re.IGNORECASE)
+
+# Stage 6
+# Tag names match case-insensitively; the class value, as in HTML, does not
+_RE_ALGORITHM = re.compile(r'(?i:<figure)[^>]*(?i:class)="[^"]*ltx_float_algorithm[^"]*"[^>]*>.*?(?i:</figure>)',
+                           re.DOTALL)
+_RE_LISTINGLINE = re.compile(r'<div[^>]*class="ltx_listingline"[^>]*>(.*?)</div>', re.DOTALL)
+
+# Stage 7
+_RE_THEOREM = re.compile(r'(?i:<div)[^>]*(?i:class)="[^"]*ltx_theorem[^"]*"[^>]*>.*?(?i:</div>)',
+                         re.DOTALL)
+_RE_H6 = re.compile(r'<h6[^>]*>(.*?)</h6>', re.DOTALL | re.IGNORECASE)
+_RE_P = re.compile(r'<p[^>]*>(.*?)</p>', re.DOTALL)
+
+# Stage 8
+_RE_BLOCK_CLOSE = re.compile(r'</(?:p|div|section|article)>', re.IGNORECASE)
+# Opening block tags and both list tags all become a single newline
+_RE_BLOCK_OPEN = re.compile(r'<(?:p|div|section|article)[^>]*>|</?(?:ul|ol)[^>]*>', re.IGNORECASE)
+_RE_LI_OPEN = re.compile(r'<li[^>]*>', re.IGNORECASE)
+
+# Stage 9
+# | | $$...$$ | | (N) |
+_RE_EQ_ROW = re.compile(r'^\|\s*\|\s*\$\$([^$]+)\$\$\s*\|\s*\|\s*\((\d+)\)\s*\|$')
+# | | $\displaystyle ... | $\displaystyle ... | | (N) |
+_RE_MULTI_EQ_ROW = re.compile(
+    r'^\|\s*\|\s*\$\\displaystyle\s*([^$]+)\$\s*\|\s*\$\\displaystyle\s*([^$]+)\$\s*\|\s*\|\s*\((\d+)\)\s*\|'
+)
+# | | | $\displaystyle ... | | (N) |
+_RE_CONT_EQ_ROW = re.compile(r'^\|\s*\|\s*\|\s*\$\\displaystyle\s*([^$]+)\$\s*\|\s*\|\s*\((\d+)\)\s*\|')
+# | | $\displaystyle...$ | | (N) |
+_RE_DISP_EQ_ROW = re.compile(r'^\|\s*\|\s*\$\\displaystyle\s*([^$]+)\$\s*\|\s*\|\s*\((\d+)\)\s*\|')
+_RE_PERCENT = re.compile(r'%\s*')
+
+# Stage 10
+_ENTITIES = {
+    '&nbsp;': ' ', '&lt;': '<', '&gt;': '>', '&amp;': '&', '&quot;': '"',
+    '&#39;': "'", '&times;': '×', '&minus;': '−', '&plusmn;': '±',
+    '&asymp;': '≈', '&ne;': '≠', '&le;': '≤', '&ge;': '≥',
+    '&rarr;': '→', '&larr;': '←', '&uarr;': '↑', '&darr;': '↓',
+    '&hellip;': '…', '&mdash;': '—', '&ndash;': '–',
+    '&lsquo;': "'", '&rsquo;': "'", '&ldquo;': '"', '&rdquo;': '"',
+    '&deg;': '°', '&infin;': '∞',
+}
+# Named entities, then decimal (group 1) and hex (group 2) numeric entities.
+# Longest names first, so no key can shadow a longer key it is a prefix of.
+_RE_ENTITY = re.compile(
+    '|'.join(re.escape(k) for k in sorted(_ENTITIES, key=len, reverse=True))
+    + r'|&#(\d+);|&#x([0-9a-fA-F]+);'
+)
+_RE_INLINE_WS = re.compile(r'[^\S\n]+')
+_RE_BLANK_LINES = re.compile(r'\n{3,}')
+# Empty [], () and ** ** left behind by stripped markup. Removed one kind at a
+# time, in this order, so "([])" from an empty citation goes away entirely.
+_RE_EMPTY_BRACKETS = re.compile(r'\[\s*\]')
+_RE_EMPTY_PARENS = re.compile(r'\(\s*\)')
+_RE_EMPTY_BOLD = re.compile(r'\*\*\s*\*\*')
+_RE_DOT_LINE = re.compile(r'\n\.\n')
+
+# Stats
+_RE_H2_LINE = re.compile(r'^## ', re.MULTILINE)
+_RE_H3_LINE = re.compile(r'^### ', re.MULTILINE)
+_RE_INLINE_MATH = re.compile(r'\$[^$]+\$')
+
+
 def load_html(filepath: str) -> str:
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return f.read()
+    # Decode straight from a read-only mapping so the file body is never
+    # copied into a bytes object first.
+    with open(filepath, 'rb') as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty files, pipes and other inputs that can't be mapped
+            html = f.read().decode('utf-8')
+        else:
+            with mm:
+                html = str(mm, 'utf-8')
+    # Universal newlines, as text-mode reading would apply
+    return html.replace('\r\n', '\n').replace('\r', '\n')
 
 
 def save_output(content: str, filepath: str):
@@ -29,18 +159,18 @@ def save_output(content: str, filepath: str):
 def extract_title(html: str) -> str:
     """Extract paper title from HTML."""
     # Try <h1 class="ltx_title">
-    match = re.search(r'<h1[^>]*class="[^"]*ltx_title[^"]*"[^>]*>(.*?)</h1>', html, re.DOTALL | re.IGNORECASE)
+    match = _RE_LTX_TITLE.search(html)
     if match:
         title = match.group(1)
-        title = re.sub(r'<[^>]+>', '', title)  # Remove tags
+        title = _RE_TAG.sub('', title)  # Remove tags
         title = ' '.join(title.split())  # Normalize whitespace
         return title
 
     # Try <title>
-    match = re.search(r'<title[^>]*>(.*?)</title>', html, re.DOTALL | re.IGNORECASE)
+    match = _RE_TITLE.search(html)
     if match:
         title = match.group(1)
-        title = re.sub(r'\s*[|\-]\s*arXiv.*$', '', title, flags=re.IGNORECASE)  # Remove arXiv suffix
+        title = _RE_ARXIV_SUFFIX.sub('', title)  # Remove arXiv suffix
         return title.strip()
 
     return "untitled"
@@ -49,8 +179,8 @@ def extract_title(html: str) -> str:
 def sanitize_filename(title: str) -> str:
     """Convert title to safe filename."""
     # Remove/replace invalid characters
-    filename = re.sub(r'[<>:"/\\|?*]', '', title)
-    filename = re.sub(r'\s+', '_', filename)
+    filename = _RE_FILENAME_INVALID.sub('', title)
+    filename = _RE_WS.sub('_', filename)
     filename = filename.strip('_.')
     # Truncate if too long
     if len(filename) > 100:
@@ -62,16 +192,30 @@ def sanitize_filename(title: str) -> str:
 # Stage 1: Remove unwanted elements
 # ============================================================================
 
+def _strip_comments(html: str) -> str:
+    """Remove <!-- ... --> comments by splicing around str.find() hits."""
+    parts = []
+    i = 0
+    start = html.find('<!--')
+    while start != -1:
+        end = html.find('-->', start + 4)
+        if end == -1:
+            # Unterminated comment: leave it in place
+            break
+        parts.append(html[i:start])
+        i = end + 3
+        start = html.find('<!--', i)
+    if not parts:
+        return html
+    parts.append(html[i:])
+    return ''.join(parts)
+
+
 def stage1_remove_unwanted(html: str) -> str:
     """Remove scripts, styles, nav, head, and other non-content elements."""
-    html = re.sub(r'<head[^>]*>.*?</head>', '', html, flags=re.DOTALL | re.IGNORECASE)
-    html = re.sub(r'<script[^>]*>.*?</script>', '', html, flags=re.DOTALL | re.IGNORECASE)
-    html = re.sub(r'<style[^>]*>.*?</style>', '', html, flags=re.DOTALL | re.IGNORECASE)
-    html = re.sub(r'<nav[^>]*>.*?</nav>', '', html, flags=re.DOTALL | re.IGNORECASE)
-    html = re.sub(r'<!--.*?-->', '', html, flags=re.DOTALL)
-    html = re.sub(r'<!DOCTYPE[^>]*>', '', html, flags=re.IGNORECASE)
-    html = re.sub(r'</?html[^>]*>', '', html, flags=re.IGNORECASE)
-    html = re.sub(r'</?body[^>]*>', '', html, flags=re.IGNORECASE)
+    html = _RE_UNWANTED_BLOCKS.sub('', html)
+    html = _strip_comments(html)
+    html = _RE_UNWANTED_TAGS.sub('', html)
     return html
 
 
@@ -81,24 +225,25 @@ def stage1_remove_unwanted(html: str) -> str:
 
 def stage2_handle_math(html: str) -> str:
     """Extract LaTeX from <math> elements."""
+    if '<math' not in html:
+        return html
+
     def math_replacer(m):
         content = m.group(0)
         is_block = 'display="block"' in content
-        latex_match = re.search(
-            r'<annotation[^>]*encoding="application/x-tex"[^>]*>(.*?)</annotation>',
-            content, re.DOTALL
-        )
+        latex_match = _RE_ANNOTATION.search(content)
         if latex_match:
             latex = latex_match.group(1).strip()
-            latex = latex.replace('&lt;', '<').replace('&gt;', '>').replace('&amp;', '&')
+            # Leave &lt; &gt; &amp; encoded until stage 10: a bare '<' would be
+            # taken for the start of a tag by the later stages.
             if is_block:
                 return f'\n\n$${latex}$$\n\n'
             else:
                 return f'${latex}$'
-        text = re.sub(r'<[^>]+>', '', content)
+        text = _RE_TAG.sub('', content)
         return text.strip()
 
-    html = re.sub(r'<math[^>]*>.*?</math>', math_replacer, html, flags=re.DOTALL)
+    html = _RE_MATH.sub(math_replacer, html)
     return html
 
 
@@ -109,30 +254,34 @@ def stage2_handle_math(html: str) -> str:
 def stage3_convert_semantic(html: str) -> str:
     """Convert semantic HTML tags to Markdown equivalents."""
     # Headings
-    for i in range(1, 7):
-        pattern = rf'<h{i}[^>]*>(.*?)</h{i}>'
+    for pattern, i in _HEADING_RES:
         def heading_replacer(m, level=i):
             content = m.group(1)
-            content = re.sub(r'<[^>]+>', '', content)
+            content = _RE_TAG.sub('', content)
             content = ' '.join(content.split())
             if content:
                 return f'\n\n{"#" * level} {content}\n\n'
             return ''
-        html = re.sub(pattern, heading_replacer, html, flags=re.DOTALL | re.IGNORECASE)
-
-    # Bold, italic, code
-    html = re.sub(r'<(?:strong|b)[^>]*>(.*?)</(?:strong|b)>', r'**\1**', html, flags=re.DOTALL | re.IGNORECASE)
-    html = re.sub(r'<(?:em|i)[^>]*>(.*?)</(?:em|i)>', r'*\1*', html, flags=re.DOTALL | re.IGNORECASE)
-    html = re.sub(r'<code[^>]*>(.*?)</code>', r'`\1`', html, flags=re.DOTALL | re.IGNORECASE)
-    html = re.sub(r'<br\s*/?>', '\n', html, flags=re.IGNORECASE)
-    html = re.sub(r'<hr\s*/?>', '\n\n---\n\n', html, flags=re.IGNORECASE)
+        html = pattern.sub(heading_replacer, html)
+
+    # Bold, italic, code, line breaks and rules
+    def inline_replacer(m):
+        tag = m.group(1)
+        if tag is None:
+            return _INLINE_FORMATS[m.group(3).lower()]
+        content = m.group(2)
+        if '<' in content:
+            # Nested inline markup, e.g. <b><i>x</i></b>
+            content = _RE_INLINE.sub(inline_replacer, content)
+        return _INLINE_FORMATS[tag.lower()].format(content)
+    html = _RE_INLINE.sub(inline_replacer, html)
 
     # Links
     def link_replacer(m):
         full_tag = m.group(0)
-        href_match = re.search(r'href=["\']([^"\']+)["\']', full_tag)
+        href_match = _RE_HREF.search(full_tag)
         text = m.group(1)
-        text = re.sub(r'<[^>]+>', '', text)
+        text = _RE_TAG.sub('', text)
         text = ' '.join(text.split())
         if href_match and text:
             url = href_match.group(1)
@@ -141,17 +290,17 @@ def stage3_convert_semantic(html: str) -> str:
                 return f'[{text}](#{anchor})'
             return f'[{text}]({url})'
         return text
-    html = re.sub(r'<a[^>]*>(.*?)</a>', link_replacer, html, flags=re.DOTALL | re.IGNORECASE)
+    html = _RE_LINK.sub(link_replacer, html)
 
     # Citations
     def cite_replacer(m):
         content = m.group(1)
-        refs = re.findall(r'ltx_ref_self">([^<]+)<', content)
+        refs = _RE_REF_SELF.findall(content)
         if refs:
             return '[' + ', '.join(refs) + ']'
-        text = re.sub(r'<[^>]+>', '', content)
+        text = _RE_TAG.sub('', content)
         return '[' + text.strip() + ']'
-    html = re.sub(r'<cite[^>]*>(.*?)</cite>', cite_replacer, html, flags=re.DOTALL | re.IGNORECASE)
+    html = _RE_CITE.sub(cite_replacer, html)
 
     return html
 
@@ -165,31 +314,29 @@ def stage4_handle_figures(html: str) -> str:
     def figure_replacer(m):
         content = m.group(0)
         result_parts = []
-        for img_match in re.finditer(r'<img[^>]*src=["\']([^"\']+)["\'][^>]*/?>',
-                                      content, re.IGNORECASE):
+        for img_match in _RE_FIGURE_IMG.finditer(content):
             src = img_match.group(1)
             result_parts.append(f'![Figure]({src})')
-        caption_match = re.search(r'<figcaption[^>]*>(.*?)</figcaption>',
-                                   content, re.DOTALL | re.IGNORECASE)
+        caption_match = _RE_FIGCAPTION.search(content)
         if caption_match:
             caption = caption_match.group(1)
-            caption = re.sub(r'<[^>]+>', '', caption)
+            caption = _RE_TAG.sub('', caption)
             caption = ' '.join(caption.split())
             if caption:
                 result_parts.append(f'\n*{caption}*')
         return '\n\n' + '\n'.join(result_parts) + '\n\n' if result_parts else ''
 
-    html = re.sub(r'<figure[^>]*>.*?</figure>', figure_replacer, html, flags=re.DOTALL | re.IGNORECASE)
+    html = _RE_FIGURE.sub(figure_replacer, html)
 
     def img_replacer(m):
-        src_match = re.search(r'src=["\']([^"\']+)["\']', m.group(0))
-        alt_match = re.search(r'alt=["\']([^"\']*)["\']', m.group(0))
+        src_match = _RE_SRC.search(m.group(0))
+        alt_match = _RE_ALT.search(m.group(0))
         if src_match:
             src = src_match.group(1)
             alt = alt_match.group(1) if alt_match else "Image"
             return f'\n\n![{alt}]({src})\n\n'
         return ''
-    html = re.sub(r'<img[^>]*/?>(?![^<]*</figure>)', img_replacer, html, flags=re.IGNORECASE)
+    html = _RE_IMG.sub(img_replacer, html)
 
     return html
 
@@ -203,27 +350,26 @@ def stage5_handle_tables(html: str) -> str:
     def table_replacer(m):
         table_html = m.group(0)
         rows = []
-        for row_match in re.finditer(r'<tr[^>]*>(.*?)</tr>', table_html, re.DOTALL | re.IGNORECASE):
+        num_cols = 0
+        for row_match in _RE_TR.finditer(table_html):
             row_content = row_match.group(1)
             cells = []
-            for cell_match in re.finditer(r'<(?:th|td)[^>]*>(.*?)</(?:th|td)>',
-                                           row_content, re.DOTALL | re.IGNORECASE):
+            for cell_match in _RE_TD.finditer(row_content):
                 cell = cell_match.group(1)
-                cell = re.sub(r'<[^>]+>', '', cell)
+                cell = _RE_TAG.sub('', cell)
                 cell = ' '.join(cell.split())
                 cells.append(cell if cell else ' ')
             if cells:
-                rows.append('| ' + ' | '.join(cells) + ' |')
-        if len(rows) >= 1:
-            num_cols = rows[0].count('|') - 1
-            separator = '|' + '---|' * num_cols
-            result = rows[0] + '\n' + separator
-            if len(rows) > 1:
-                result += '\n' + '\n'.join(rows[1:])
-            return '\n\n' + result + '\n\n'
+                if not rows:
+                    num_cols = len(cells)
+                rows.append(f'| {" | ".join(cells)} |')
+        if rows:
+            # Header separator goes right after the first row
+            rows.insert(1, '|' + '---|' * num_cols)
+            return '\n\n' + '\n'.join(rows) + '\n\n'
         return ''
 
-    html = re.sub(r'<table[^>]*>.*?</table>', table_replacer, html, flags=re.DOTALL | re.IGNORECASE)
+    html = _RE_TABLE.sub(table_replacer, html)
     return html
 
 
@@ -233,31 +379,31 @@ def stage5_handle_tables(html: str) -> str:
 
 def stage6_handle_algorithms(html: str) -> str:
     """Handle algorithm listing blocks."""
+    if 'ltx_float_algorithm' not in html:
+        return html
+
     def algorithm_replacer(m):
         content = m.group(0)
-        caption_match = re.search(r'<figcaption[^>]*>(.*?)</figcaption>',
-                                   content, re.DOTALL | re.IGNORECASE)
+        caption_match = _RE_FIGCAPTION.search(content)
         title = ""
         if caption_match:
-            title = re.sub(r'<[^>]+>', '', caption_match.group(1))
+            title = _RE_TAG.sub('', caption_match.group(1))
             title = ' '.join(title.split())
         lines = []
-        for line_match in re.finditer(r'<div[^>]*class="ltx_listingline"[^>]*>(.*?)</div>',
-                                       content, re.DOTALL):
+        for line_match in _RE_LISTINGLINE.finditer(content):
             line = line_match.group(1)
-            line = re.sub(r'<[^>]+>', '', line)
+            line = _RE_TAG.sub('', line)
             line = line.strip()
             if line:
                 lines.append(line)
         if lines:
-            result = f'\n\n**{title}**\n\n```\n' if title else '\n\n```\n'
-            result += '\n'.join(lines)
-            result += '\n```\n\n'
-            return result
+            body = '\n'.join(lines)
+            if title:
+                return f'\n\n**{title}**\n\n```\n{body}\n```\n\n'
+            return f'\n\n```\n{body}\n```\n\n'
         return ''
 
-    html = re.sub(r'<figure[^>]*class="[^"]*ltx_float_algorithm[^"]*"[^>]*>.*?</figure>',
-                  algorithm_replacer, html, flags=re.DOTALL | re.IGNORECASE)
+    html = _RE_ALGORITHM.sub(algorithm_replacer, html)
     return html
 
 
@@ -267,23 +413,22 @@ def stage6_handle_algorithms(html: str) -> str:
 
 def stage7_handle_definitions(html: str) -> str:
     """Handle definition, theorem blocks."""
+    if 'ltx_theorem' not in html:
+        return html
+
     def def_replacer(m):
         content = m.group(0)
-        title_match = re.search(r'<h6[^>]*>(.*?)</h6>', content, re.DOTALL | re.IGNORECASE)
+        title_match = _RE_H6.search(content)
         title = ""
         if title_match:
-            title = re.sub(r'<[^>]+>', '', title_match.group(1))
+            title = _RE_TAG.sub('', title_match.group(1))
             title = ' '.join(title.split())
-        body_parts = []
-        for para_match in re.finditer(r'<p[^>]*>(.*?)</p>', content, re.DOTALL):
-            para = para_match.group(1)
-            body_parts.append(para)
+        body = '\n\n'.join(_RE_P.findall(content))
         if title:
-            return f'\n\n**{title}**\n\n' + '\n\n'.join(body_parts) + '\n'
-        return '\n' + '\n\n'.join(body_parts) + '\n'
+            return f'\n\n**{title}**\n\n{body}\n'
+        return f'\n{body}\n'
 
-    html = re.sub(r'<div[^>]*class="[^"]*ltx_theorem[^"]*"[^>]*>.*?</div>',
-                  def_replacer, html, flags=re.DOTALL | re.IGNORECASE)
+    html = _RE_THEOREM.sub(def_replacer, html)
     return html
 
 
@@ -293,14 +438,12 @@ def stage7_handle_definitions(html: str) -> str:
 
 def stage8_strip_tags(html: str) -> str:
     """Remove all remaining HTML tags."""
-    html = re.sub(r'</(?:p|div|section|article)>', '\n\n', html, flags=re.IGNORECASE)
-    html = re.sub(r'<(?:p|div|section|article)[^>]*>', '\n', html, flags=re.IGNORECASE)
-    html = re.sub(r'<li[^>]*>', '\n- ', html, flags=re.IGNORECASE)
-    html = re.sub(r'</li>', '', html, flags=re.IGNORECASE)
-    html = re.sub(r'</?(?:ul|ol)[^>]*>', '\n', html, flags=re.IGNORECASE)
-    html = re.sub(r'<span[^>]*class="[^"]*ltx_tag_equation[^"]*"[^>]*>\((\d+)\)</span>',
-                  r'(\1)', html, flags=re.IGNORECASE)
-    html = re.sub(r'<[^>]+>', '', html)
+    html = _RE_BLOCK_CLOSE.sub('\n\n', html)
+    html = _RE_BLOCK_OPEN.sub('\n', html)
+    html = _RE_LI_OPEN.sub('\n- ', html)
+    # </li> and equation-number spans need no special case: stripping the
+    # tags leaves exactly what they would have been replaced with.
+    html = _RE_TAG.sub('', html)
     return html
 
 
@@ -311,32 +454,35 @@ def stage8_strip_tags(html: str) -> str:
 def stage9_clean_equation_tables(text: str) -> str:
     """Convert equation tables to clean LaTeX display math."""
     lines = text.split('\n')
+    num_lines = len(lines)
     result = []
     i = 0
 
-    while i < len(lines):
+    while i < num_lines:
         line = lines[i]
+        stripped = line.strip()
+
+        # Every equation row and separator is a table line; pass the rest
+        # through without trying the row patterns.
+        if not stripped.startswith('|'):
+            result.append(line)
+            i += 1
+            continue
 
         # Detect equation table row: | | $$...$$ | | (N) | or | | $\displaystyle...$ | ...
-        eq_match = re.match(
-            r'^\|\s*\|\s*\$\$([^$]+)\$\$\s*\|\s*\|\s*\((\d+)\)\s*\|$',
-            line.strip()
-        )
+        eq_match = _RE_EQ_ROW.match(stripped)
         if eq_match:
             formula = eq_match.group(1).strip()
             num = eq_match.group(2)
             result.append(f'$${formula}$$ \\tag{{{num}}}')
             # Skip separator line if present
-            if i + 1 < len(lines) and lines[i + 1].strip().startswith('|---'):
+            if i + 1 < num_lines and lines[i + 1].strip().startswith('|---'):
                 i += 1
             i += 1
             continue
 
         # Detect multi-cell equation: | | $\displaystyle ... | $\displaystyle ... | | (N) |
-        multi_eq_match = re.match(
-            r'^\|\s*\|\s*\$\\displaystyle\s*([^$]+)\$\s*\|\s*\$\\displaystyle\s*([^$]+)\$\s*\|\s*\|\s*\((\d+)\)\s*\|',
-            line.strip()
-        )
+        multi_eq_match = _RE_MULTI_EQ_ROW.match(stripped)
         if multi_eq_match:
             # This is a multi-line equation block, collect all parts
             lhs = multi_eq_match.group(1).strip()
@@ -344,25 +490,22 @@ def stage9_clean_equation_tables(text: str) -> str:
             num = multi_eq_match.group(3)
 
             # Clean up % artifacts from LaTeX
-            rhs = re.sub(r'%\s*', '', rhs)
+            rhs = _RE_PERCENT.sub('', rhs)
 
             eq_lines = [(lhs, rhs, num)]
             i += 1
 
             # Skip separator
-            if i < len(lines) and lines[i].strip().startswith('|---'):
+            if i < num_lines and lines[i].strip().startswith('|---'):
                 i += 1
 
             # Collect continuation lines: | | | $\displaystyle ... | | (N) |
-            while i < len(lines):
-                cont_match = re.match(
-                    r'^\|\s*\|\s*\|\s*\$\\displaystyle\s*([^$]+)\$\s*\|\s*\|\s*\((\d+)\)\s*\|',
-                    lines[i].strip()
-                )
+            while i < num_lines:
+                cont_match = _RE_CONT_EQ_ROW.match(lines[i].strip())
                 if cont_match:
                     cont_formula = cont_match.group(1).strip()
                     cont_num = cont_match.group(2)
-                    cont_formula = re.sub(r'%\s*', '', cont_formula)
+                    cont_formula = _RE_PERCENT.sub('', cont_formula)
                     eq_lines.append(('', cont_formula, cont_num))
                     i += 1
                 else:
@@ -381,23 +524,20 @@ def stage9_clean_equation_tables(text: str) -> str:
             continue
 
         # Detect single displaystyle equation: | | $\displaystyle...$ | | (N) |
-        single_disp_match = re.match(
-            r'^\|\s*\|\s*\$\\displaystyle\s*([^$]+)\$\s*\|\s*\|\s*\((\d+)\)\s*\|',
-            line.strip()
-        )
+        single_disp_match = _RE_DISP_EQ_ROW.match(stripped)
         if single_disp_match:
             formula = single_disp_match.group(1).strip()
             num = single_disp_match.group(2)
-            formula = re.sub(r'%\s*', '', formula)
+            formula = _RE_PERCENT.sub('', formula)
             result.append(f'$${formula}$$ \\tag{{{num}}}')
             # Skip separator
-            if i + 1 < len(lines) and lines[i + 1].strip().startswith('|---'):
+            if i + 1 < num_lines and lines[i + 1].strip().startswith('|---'):
                 i += 1
             i += 1
             continue
 
         # Skip orphan separator lines (from equation tables)
-        if line.strip().startswith('|---') and '|' in line:
+        if stripped.startswith('|---'):
             # Check if previous line was an equation we processed
             if result and ('\\tag{' in result[-1] or result[-1] == '$$'):
                 i += 1
@@ -415,29 +555,24 @@ def stage9_clean_equation_tables(text: str) -> str:
 
 def stage10_cleanup(text: str) -> str:
     """Clean up whitespace and formatting."""
-    entities = {
-        '&nbsp;': ' ', '&lt;': '<', '&gt;': '>', '&amp;': '&', '&quot;': '"',
-        '&#39;': "'", '&times;': '×', '&minus;': '−', '&plusmn;': '±',
-        '&asymp;': '≈', '&ne;': '≠', '&le;': '≤', '&ge;': '≥',
-        '&rarr;': '→', '&larr;': '←', '&uarr;': '↑', '&darr;': '↓',
-        '&hellip;': '…', '&mdash;': '—', '&ndash;': '–',
-        '&lsquo;': ''', '&rsquo;': ''', '&ldquo;': '"', '&rdquo;': '"',
-        '&deg;': '°', '&infin;': '∞',
-    }
-    for entity, char in entities.items():
-        text = text.replace(entity, char)
-    text = re.sub(r'&#(\d+);', lambda m: chr(int(m.group(1))), text)
-    text = re.sub(r'&#x([0-9a-fA-F]+);', lambda m: chr(int(m.group(1), 16)), text)
-    text = re.sub(r'[^\S\n]+', ' ', text)
-    text = re.sub(r'\n{3,}', '\n\n', text)
+    def entity_replacer(m):
+        if m.group(1):
+            return chr(int(m.group(1)))
+        if m.group(2):
+            return chr(int(m.group(2), 16))
+        return _ENTITIES[m.group(0)]
+
+    text = _RE_ENTITY.sub(entity_replacer, text)
+    text = _RE_INLINE_WS.sub(' ', text)
+    text = _RE_BLANK_LINES.sub('\n\n', text)
     lines = text.split('\n')
     lines = [line.strip() for line in lines]
     text = '\n'.join(lines)
     text = text.strip()
-    text = re.sub(r'\[\s*\]', '', text)
-    text = re.sub(r'\(\s*\)', '', text)
-    text = re.sub(r'\*\*\s*\*\*', '', text)
-    text = re.sub(r'\n\.\n', '\n', text)
+    text = _RE_EMPTY_BRACKETS.sub('', text)
+    text = _RE_EMPTY_PARENS.sub('', text)
+    text = _RE_EMPTY_BOLD.sub('', text)
+    text = _RE_DOT_LINE.sub('\n', text)
     return text
 
 
@@ -445,7 +580,12 @@ def stage10_cleanup(text: str) -> str:
 # Main
 # ============================================================================
 
-def convert_html_to_markdown(html: str, verbose: bool = True) -> str:
+def _count_tags(content: str) -> int:
+    # Count without materializing a list of every tag string
+    return sum(1 for _ in _RE_TAG.finditer(content))
+
+
+def convert_html_to_markdown(html: str, verbose: bool = False) -> str:
     """Convert HTML to Markdown by progressive stripping."""
     stages = [
         ("1. Remove unwanted elements", stage1_remove_unwanted),
@@ -464,7 +604,7 @@ def convert_html_to_markdown(html: str, verbose: bool = True) -> str:
     for name, func in stages:
         content = func(content)
         if verbose:
-            tag_count = len(re.findall(r'<[^>]+>', content))
+            tag_count = _count_tags(content)
             print(f"  {name}: {len(content):,} chars, {tag_count} tags")
 
     return content
@@ -509,15 +649,15 @@ def main():
     print(f"Loaded {len(html_content):,} characters\n")
 
     print("Converting:")
-    markdown = convert_html_to_markdown(html_content)
+    markdown = convert_html_to_markdown(html_content, verbose=True)
 
     print(f"\nFinal: {len(markdown):,} characters")
     save_output(markdown, output_file)
 
     # Stats
-    h2_count = len(re.findall(r'^## ', markdown, re.MULTILINE))
-    h3_count = len(re.findall(r'^### ', markdown, re.MULTILINE))
-    math_count = len(re.findall(r'\$[^$]+\$', markdown))
+    h2_count = len(_RE_H2_LINE.findall(markdown))
+    h3_count = len(_RE_H3_LINE.findall(markdown))
+    math_count = len(_RE_INLINE_MATH.findall(markdown))
     print(f"\nStats: {h2_count} sections, {h3_count} subsections, {math_count} math expressions")
 
     # Output title for shell script (last line)